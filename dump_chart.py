@@ -1,28 +1,32 @@
 # dump_chart.py
 # Print a chart: Key line + per-bar RN token and literal (as written).
-# Minimal change: supports a directory path (alphabetical).
+# Minimal change: supports a directory path (alphabetical, dumped in parallel).
 
+import io
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from pathlib import Path
-from music21 import converter, harmony, roman
-from rn_utils import prettify_literal, pretty_from_rn_and_literal, prefer_written_key, pretty_key_name
+from rn_utils import (prettify_literal, pretty_from_rn_and_literal, pretty_key_name,
+                      measure_number, rn_figure_for, written_key_and_harmonies)
 
 def dump_one(xml_path: str):
+    from music21 import converter  # deferred: music21 start-up is slow
     s = converter.parse(xml_path)
-    k = prefer_written_key(s)
-    print(f"Key: {pretty_key_name(k)} (written/analyzed)")
-    # Gather harmony objects in bar order
+    # Gather harmony objects in bar order (same walk as the key lookup)
     # music21 harmony elements provide figure + measure info
-    for h in s.recurse().getElementsByClass(harmony.ChordSymbol):
+    k, harmonies = written_key_and_harmonies(s)
+    print(f"Key: {pretty_key_name(k)} (written/analyzed)")
+    for h in harmonies:
         try:
-            mnum = h.measureNumber
+            mnum = measure_number(h)
         except Exception:
             mnum = None
         literal = prettify_literal(h.figure or "")
         # Try a romanNumeralFromChord against the key, fallback to blank
         try:
-            rn = roman.romanNumeralFromChord(h, k)
-            rn_token = pretty_from_rn_and_literal(rn.figure, literal)
+            rn_token = pretty_from_rn_and_literal(rn_figure_for(h, k), literal, already_pretty=True)
         except Exception:
             rn_token = ""  # unknown
         if rn_token:
@@ -31,6 +35,17 @@ def dump_one(xml_path: str):
             # still show literal even if RN failed
             print(f"m {mnum:>3}: {'':<8} ({literal})")
 
+def _dump_to_string(xml_path: str) -> str:
+    """Run dump_one in a worker process and hand back what it printed."""
+    buf = io.StringIO()
+    with redirect_stdout(buf):
+        try:
+            dump_one(xml_path)
+        except Exception as e:
+            # report in place and keep going, as scan_rn_patterns does
+            print(f"× {Path(xml_path).stem}: ERROR ({e})")
+    return buf.getvalue()
+
 def main():
     if len(sys.argv) < 2:
         print("usage: python dump_chart.py <file-or-folder>")
@@ -38,13 +53,18 @@ def main():
 
     p = Path(sys.argv[1])
     if p.is_dir():
-        files = sorted(
-            [x for x in p.iterdir() if x.suffix.lower() in (".musicxml", ".xml", ".mxl")],
-            key=lambda x: x.name.lower(),
-        )
-        for f in files:
-            print(f"\n=== {f.name} ===")
-            dump_one(str(f))
+        # scandir: suffix test on the raw name, no Path object per entry
+        with os.scandir(p) as it:
+            names = sorted(
+                (e.name for e in it if e.is_file() and e.name.lower().endswith((".musicxml", ".xml", ".mxl"))),
+                key=str.lower,
+            )
+        # Files are independent: dump them across cores, print in order
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+            futures = [ex.submit(_dump_to_string, os.path.join(p, n)) for n in names]
+            for name, fut in zip(names, futures):
+                print(f"\n=== {name} ===")
+                print(fut.result(), end="")
     else:
         dump_one(str(p))
 
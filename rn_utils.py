@@ -1,44 +1,61 @@
 # rn_utils.py
-from music21 import key as m21key
+# music21 is imported inside the functions that need it: the string
+# helpers stay importable (and the CLIs' --help fast) without paying for
+# music21's start-up.
+from __future__ import annotations
+from functools import lru_cache
+from typing import TYPE_CHECKING
 import re
 
+if TYPE_CHECKING:
+    from music21 import key as m21key
+
 # ---------------- Preferences ----------------
 PRINT_69_STYLE = "69"  # change to "6/9" if you prefer
 
 # ---------------- Literal prettifiers ----------------
 
 # Convert E-→Eb, F+→F# when +/- follows pitch letter
-_ROOT_PLUSMINUS = re.compile(r"\b([A-Ga-g])([+-])")
+_ROOT_PLUSMINUS = r"\b([A-Ga-g])([+-])"
 
 # Normalize odd "sus4" exports
-_SUS4_VARIANTS = [
-    re.compile(r"\badd\s*4\s*(?:subtract|minus|no|omit)\s*3\b", re.I),
-    re.compile(r"\badd4\s*(?:subtract|minus|no|omit)\s*3\b", re.I),
-    re.compile(r"\badd\s*11\s*(?:no|omit)\s*3\b", re.I),
-    re.compile(r"\bsus\s*4\b", re.I),
-]
-
-def _root_plus_minus_to_acc(text: str) -> str:
-    def _swap(m):
-        note, acc = m.group(1), m.group(2)
-        return f"{note}{'b' if acc == '-' else '#'}"
-    return _ROOT_PLUSMINUS.sub(_swap, text)
-
-def _normalize_sus4(text: str) -> str:
-    s = text
-    for pat in _SUS4_VARIANTS:
-        s = pat.sub("sus4", s)
-    s = re.sub(r"\b(sus4)(\s+\1\b)+", r"\1", s, flags=re.I)
-    return s
-
+_SUS4_VARIANTS = (
+    r"\badd\s*4\s*(?:subtract|minus|no|omit)\s*3\b",
+    r"\badd4\s*(?:subtract|minus|no|omit)\s*3\b",
+    r"\badd\s*11\s*(?:no|omit)\s*3\b",
+    r"\bsus\s*4\b",
+)
+_SUS4_ANY = "(?:" + "|".join(_SUS4_VARIANTS) + ")"
+
+# All literal fixes in one pass, dispatched on m.lastgroup:
+#   rpm – root +/- → #/b
+#   sus – any sus4 spelling, repeats folded into a single "sus4"
+#         (not right after a root '-', which becomes 'b' and kills the \b)
+#   ws  – collapse runs of whitespace
+_LITERAL_FUSED = re.compile(
+    rf"(?P<rpm>{_ROOT_PLUSMINUS})"
+    rf"|(?P<sus>(?<!\b[A-Ga-g]-){_SUS4_ANY}(?:\s+{_SUS4_ANY})*)"
+    r"|(?P<ws>\s{2,})",
+    re.I,
+)
+
+def _literal_dispatch(m) -> str:
+    kind = m.lastgroup
+    if kind == "rpm":
+        return m.group(2) + ("b" if m.group(3) == "-" else "#")
+    if kind == "sus":
+        return "sus4"
+    return " "
+
+@lru_cache(maxsize=4096)
 def prettify_literal(literal: str) -> str:
     if not literal:
         return literal
-    s = literal.strip()
-    s = _root_plus_minus_to_acc(s)
-    s = _normalize_sus4(s)
-    s = re.sub(r"\s{2,}", " ", s)
-    return s
+    # An all-alphanumeric literal has no +/- or spaces, and a \b only at its
+    # ends, so only a leading sus/add spelling could still change it
+    if literal.isalnum() and literal[:3].lower() not in ("add", "sus"):
+        return literal
+    return _LITERAL_FUSED.sub(_literal_dispatch, literal.strip())
 
 
 # ---------------- RN normalization ----------------
@@ -47,7 +64,10 @@ def prettify_literal(literal: str) -> str:
 MAJ7_ALIASES  = re.compile(r"(?:\^7|M7|maj7|Δ7|Δ)", re.I)
 # A "plain 7" (dominant) in literals: not maj7, not m7, not ø7/o7
 DOM7_PLAIN_RE = re.compile(r"(?<![øo])7(?![0-9])", re.I)
+# <accidental><DEGREE><qual...>
+_RN_DEGREE_RE = re.compile(r"^([b#]?)(VII|VI|V|IV|III|II|I|vii|vi|v|iv|iii|ii|i)(.*)$")
 
+@lru_cache(maxsize=4096)
 def normalize_rn(fig: str) -> str:
     """
     Normalize an RN string:
@@ -55,8 +75,9 @@ def normalize_rn(fig: str) -> str:
       - return <accidental><DEGREE><qual...> with DEGREE uppercased
     """
     t = (fig or "").replace(" ", "")
-    t = MAJ7_ALIASES.sub("maj7", t)
-    m = re.match(r"^([b#]?)(VII|VI|V|IV|III|II|I|vii|vi|v|iv|iii|ii|i)(.*)$", t)
+    if MAJ7_ALIASES.search(t):  # most figures carry no alias; skip the rebuild
+        t = MAJ7_ALIASES.sub("maj7", t)
+    m = _RN_DEGREE_RE.match(t)
     if not m:
         return ""
     acc, deg, qual = m.groups()
@@ -71,12 +92,128 @@ LIT_HALFDIM_RE = re.compile(r"(?:m7b5|ø7)", re.I)
 # "Maj-family" (maj7/9/13 indications in the literal)
 LIT_MAJ_FAM_RE = re.compile(r"(?:maj|\^|Δ)\s*(?:7|9|13)\b", re.I)
 
-_DEGREE_HEAD = re.compile(r"^([b#]?)(VII|VI|V|IV|III|II|I|vii|vi|v|iv|iii|ii|i)")
+# Literal traits packed into one int for pretty_from_rn_and_literal
+_F_MINMAJ7   = 1 << 0
+_F_DIM7      = 1 << 1
+_F_HALF      = 1 << 2
+_F_MAJ_FAM   = 1 << 3   # maj7/9/13, or implied by minor–major7
+_F_MIN_TRIAD = 1 << 4
+_F_MIN7      = 1 << 5   # 'm7' not overridden by maj/ø/o
+_F_MIN6      = 1 << 6
+_F_MIN_WORD  = 1 << 7   # 'min' outside the maj family
+_F_M7_LIT    = 1 << 8   # raw 'm7' hit, before the overrides
+_F_MIN_LIT   = 1 << 9   # raw 'min' hit
+_F_6_9       = 1 << 10
+_TRAIT_BIT = {
+    "mm7": _F_MINMAJ7, "dim": _F_DIM7, "hd": _F_HALF, "maj": _F_MAJ_FAM,
+    "triad": _F_MIN_TRIAD, "m7": _F_M7_LIT, "m6": _F_MIN6, "minw": _F_MIN_LIT,
+    "s69": _F_6_9, "s69b": _F_6_9,
+}
+# Any of these lowercases the degree (unless the literal is a dominant 7)
+_MINORISH_MASK = _F_MIN7 | _F_MIN6 | _F_HALF | _F_DIM7 | _F_MIN_WORD | _F_MIN_TRIAD
+
+# Longest first, as in _RN_DEGREE_RE
+_UPPER_DEGREES = ("VII", "VI", "V", "IV", "III", "II", "I")
+
+def _split_normalized_rn(rn: str):
+    """
+    (acc, DEGREE, qual) for a normalize_rn() result, or None. The degree is
+    already uppercase there, so plain prefix checks replace a regex match.
+    """
+    i = 1 if rn[:1] in ("b", "#") else 0
+    for deg in _UPPER_DEGREES:
+        if rn.startswith(deg, i):
+            return rn[:i], deg, rn[i + len(deg):]
+    return None
+
 # Strip RN inversion figures so they never leak into tokens
 _INVERSION_FIGS_RE = re.compile(r"(?:65|64|63|62|54|53|43|42|32)")
 
+# Minor / 6 / 6-9 traits in the (lowercased) literal
+_MIN_TRIAD_RE = re.compile(r"^[a-g][#b]?m(?=$|[/\s(]|[0-9])")
+_M7_RE        = re.compile(r"m7\b")
+_M6_RE        = re.compile(r"m6\b")
+_MIN_WORD_RE  = re.compile(r"\bmin\b")
+_6_9_RE       = re.compile(r"6\s*(?:/|-|\+|add|\()\s*9\)?")
+_69_RE        = re.compile(r"\b69\b")
+
+# Every literal detector above in one scan; each hit is classified by
+# m.lastgroup. Alternatives are zero-width lookaheads so overlapping hits
+# (Am7: triad + m7, Cm6/9: m6 + 6/9) are all seen, and no two of them can
+# start at the same position, so this equals one search() per detector.
+# The leading class is every detector's first character (the triad is
+# anchored at ^), so most positions are rejected before the alternation.
+_LIT_TRAITS_RE = re.compile(
+    rf"^(?=(?P<triad>{_MIN_TRIAD_RE.pattern}))|(?=[md°oø^Δ6])(?:"
+    + "|".join(f"(?=(?P<{name}>{rx.pattern}))" for name, rx in (
+        ("mm7", LIT_MINMAJ7_RE), ("dim", LIT_DIM_RE), ("hd", LIT_HALFDIM_RE),
+        ("maj", LIT_MAJ_FAM_RE), ("m7", _M7_RE), ("m6", _M6_RE),
+        ("minw", _MIN_WORD_RE), ("s69", _6_9_RE), ("s69b", _69_RE),
+    ))
+    + ")",
+    re.I,
+)
+# A '7' in the literal is only a plain dominant without any of these
+# ("maj7" is covered by "maj")
+_NON_DOM7_TAGS = ("maj", "m7", "ø7", "o7")
+_NON_DOM7_RE   = re.compile("|".join(map(re.escape, _NON_DOM7_TAGS)))
+
+# RN-quality fallback: every classifier in one scan. The old if/elif
+# priority is kept by collecting all hits and taking the first in
+# _QLOW_PRIORITY (a leftmost match alone would let "7maj" read as a 7).
+_QLOW_CLASSIFY = re.compile(
+    r"(?P<maj7>maj)|(?P<hd>ø7)|(?P<d7>o7)|(?P<s69>6/9|69)|(?P<n6>(?<!\d)6(?![/\d]))|(?P<n7>7)"
+)
+_QLOW_PRIORITY = ("maj7", "hd", "d7", "s69", "n6", "n7")
+_QLOW_SUFFIX = {"maj7": "maj7", "hd": "ø7", "d7": "o7", "n6": "6", "n7": "7"}  # s69: PRINT_69_STYLE
+
+def _build_base(acc: str, DEG: str, DEG_case: str, flags: int, qlow: str,
+                has_6_9: bool, has_6_only: bool, is_dom7_lit: bool) -> str:
+    """
+    Base RN token (priority order) from the literal traits worked out by
+    pretty_from_rn_and_literal; the RN quality (qlow) is the fallback.
+    """
+    if flags & _F_DIM7:
+        return acc + DEG_case + "o7"
+    elif flags & _F_HALF:
+        return acc + DEG_case + "ø7"
+    elif flags & _F_MINMAJ7:
+        return acc + DEG_case + "maj7"    # minor–major7 (degree already lower if minor)
+    elif flags & _F_MAJ_FAM:
+        return acc + DEG + "maj7"         # maj-family keeps uppercase degree
+    elif has_6_9:
+        # treat 6/9 as major-family unless clearly minor triad literal
+        if DEG_case[0] >= "a" or flags & _F_MIN_TRIAD:  # DEG is ASCII; lowered when minor
+            return acc + DEG_case + "-6"  # conservative for minor 6/9 (rarely present literally)
+        else:
+            return acc + DEG + PRINT_69_STYLE
+    elif has_6_only and not (flags & _F_MIN6):
+        return acc + DEG + "6"
+    elif flags & _F_MIN6:
+        return acc + DEG_case + "-6"
+    elif flags & _F_MIN7:
+        return acc + DEG_case + "-7"
+    elif is_dom7_lit:
+        return acc + DEG + "7"            # dominant 7 (degree uppercase)
+    elif flags & _F_MIN_TRIAD:
+        return acc + DEG_case             # Am → iii
+    else:
+        # RN fallback when literal doesn’t specify quality
+        hits = {mm.lastgroup for mm in _QLOW_CLASSIFY.finditer(qlow)}
+        if "d7" in hits:
+            hits.discard("n7")          # any o7 rules out a plain 7
+            if "ø" in qlow:
+                hits.discard("d7")
+        kind = next((g for g in _QLOW_PRIORITY if g in hits), None)
+        if kind == "s69":
+            return acc + DEG + PRINT_69_STYLE
+        elif kind:
+            return acc + DEG + _QLOW_SUFFIX[kind]
+        else:
+            return acc + DEG_case + qlow  # inversion figures already gone
 
-def pretty_from_rn_and_literal(rn_fig: str, literal: str) -> str:
+@lru_cache(maxsize=4096)
+def pretty_from_rn_and_literal(rn_fig: str, literal: str, already_pretty: bool = False) -> str:
     """
     Literal-first RN prettyfier (STRICT + minimal changes):
       • Dominant detection: any literal with a plain '7' (not maj7/m7/ø7/o7)
@@ -89,100 +226,55 @@ def pretty_from_rn_and_literal(rn_fig: str, literal: str) -> str:
       • RN inversion figures are removed from the RN quality.
       • Falls back conservatively to the RN's own quality when literal
         doesn't say enough.
+    Pass already_pretty=True when `literal` came from prettify_literal.
     """
     if not rn_fig:
         return rn_fig
 
-    lit_pretty = prettify_literal(literal or "")
+    lit_pretty = (literal or "") if already_pretty else prettify_literal(literal or "")
     rn = normalize_rn(rn_fig)
 
-    m = _DEGREE_HEAD.match(rn)
-    if not m:
+    parts = _split_normalized_rn(rn)
+    if parts is None:
         return rn_fig
-    acc, DEG = m.group(1), m.group(2)
-    qual_full = rn[len(m.group(0)):]
-    qlow = _INVERSION_FIGS_RE.sub("", (qual_full or "").lower())
+    acc, DEG, qual_full = parts
+    qlow = _INVERSION_FIGS_RE.sub("", qual_full.lower()) if qual_full else ""
 
     lit_l = (lit_pretty or "").lower()
-
-    # Families from literal
-    is_minMaj7 = bool(LIT_MINMAJ7_RE.search(lit_l))
-    is_maj_fam = bool(LIT_MAJ_FAM_RE.search(lit_l)) or is_minMaj7
-    is_dim7    = bool(LIT_DIM_RE.search(lit_l))
-    is_half    = bool(LIT_HALFDIM_RE.search(lit_l))
-
-    # Minor traits from literal
-    # Accept "Am", "Am6", "Am7", "Am9", "Am/C", etc.
-    is_min_triad = bool(re.search(r"^[a-g][#b]?m(?=$|[/\s(]|[0-9])", lit_l))
-    is_min7_lit  = bool(re.search(r"m7\b", lit_l))  # no leading \b — matches Am7 correctly
-    is_min6_lit  = bool(re.search(r"m6\b", lit_l))
-
-    # Robust 6/9: '6/9', '6-9', '69', '6 add 9'
-    has_6_9 = bool(
-        re.search(r"6\s*(?:/|-|\+|add|\()\s*9\)?", lit_l) or
-        re.search(r"\b69\b", lit_l)
-    )
-    has_6_only = (not has_6_9) and (lit_l.endswith("6") or " 6" in lit_l)
+    if not lit_l:
+        # Nothing written: no literal traits to detect, RN quality decides
+        return _build_base(acc, DEG, DEG, 0, qlow, False, False, False)
+
+    # Families and minor traits, one pass over the literal
+    # (minor triad accepts "Am", "Am6", "Am7", "Am9", "Am/C", etc.;
+    # 6/9 accepts '6/9', '6-9', '69', '6 add 9')
+    flags = 0
+    for mm in _LIT_TRAITS_RE.finditer(lit_l):
+        flags |= _TRAIT_BIT[mm.lastgroup]
+    if flags & _F_MINMAJ7:
+        flags |= _F_MAJ_FAM
+    # Minor-7 true only when literal says m7 (no leading \b — matches Am7
+    # correctly) and not overridden
+    if flags & _F_M7_LIT and not (flags & (_F_MAJ_FAM | _F_HALF | _F_DIM7)):
+        flags |= _F_MIN7
+
+    has_6_9 = bool(flags & _F_6_9)
+    # (a plain 6 needs a '6'; most literals have none, so test that first)
+    has_6_only = not has_6_9 and "6" in lit_l and (lit_l.endswith("6") or " 6" in lit_l)
 
     # Plain dominant '7' in literal (not maj7/m7/ø7/o7)
-    is_dom7_lit = ("7" in lit_l) and not any(tag in lit_l for tag in ("maj7", "maj", "m7", "ø7", "o7"))
-
-    # Minor-7 true only when literal says m7 and not overridden
-    is_min7 = is_min7_lit and not (is_maj_fam or is_half or is_dim7)
+    is_dom7_lit = ("7" in lit_l) and _NON_DOM7_RE.search(lit_l) is None
 
     # Decide degree case: dominants MUST be uppercase degree
     if is_dom7_lit:
         DEG_case = DEG
     else:
-        minorish_literal = (
-            is_min7 or is_min6_lit or is_half or is_dim7 or
-            (re.search(r"\bmin\b", lit_l) is not None and not is_maj_fam) or
-            is_min_triad
-        )
-        DEG_case = DEG.lower() if minorish_literal else DEG
+        if flags & _F_MIN_LIT and not (flags & _F_MAJ_FAM):
+            flags |= _F_MIN_WORD
+        DEG_case = DEG.lower() if (flags & _MINORISH_MASK) else DEG
 
     # --- Build base token (priority order) ---
-    if is_dim7:
-        base = f"{acc}{DEG_case}o7"
-    elif is_half:
-        base = f"{acc}{DEG_case}ø7"
-    elif is_minMaj7:
-        base = f"{acc}{DEG_case}maj7"       # minor–major7 (degree already lower if minor)
-    elif is_maj_fam:
-        base = f"{acc}{DEG}maj7"            # maj-family keeps uppercase degree
-    elif has_6_9:
-        # treat 6/9 as major-family unless clearly minor triad literal
-        if DEG_case.islower() or is_min_triad:
-            base = f"{acc}{DEG_case}-6"     # conservative for minor 6/9 (rarely present literally)
-        else:
-            base = f"{acc}{DEG}{PRINT_69_STYLE}"
-    elif has_6_only and not is_min6_lit:
-        base = f"{acc}{DEG}6"
-    elif is_min6_lit:
-        base = f"{acc}{DEG_case}-6"
-    elif is_min7:
-        base = f"{acc}{DEG_case}-7"
-    elif is_dom7_lit:
-        base = f"{acc}{DEG}7"               # dominant 7 (degree uppercase)
-    elif is_min_triad:
-        base = f"{acc}{DEG_case}"           # Am → iii
-    else:
-        # RN fallback when literal doesn’t specify quality
-        if "maj7" in qlow or "maj" in qlow:
-            base = f"{acc}{DEG}maj7"
-        elif "ø7" in qlow:
-            base = f"{acc}{DEG}ø7"
-        elif ("o7" in qlow) and ("ø" not in qlow):
-            base = f"{acc}{DEG}o7"
-        elif ("6/9" in qlow) or ("69" in qlow):
-            base = f"{acc}{DEG}{PRINT_69_STYLE}"
-        elif re.search(r"(?<!\d)6(?![/\d])", qlow):
-            base = f"{acc}{DEG}6"
-        elif ("7" in qlow) and not any(tag in qlow for tag in ("maj", "ø7", "o7")):
-            base = f"{acc}{DEG}7"
-        else:
-            qsimple = re.sub(r"(65|64|43|42|32)", "", qlow)
-            base = f"{acc}{DEG_case}{qsimple}" if qsimple else f"{acc}{DEG_case}"
+    base = _build_base(acc, DEG, DEG_case, flags, qlow, has_6_9, has_6_only, is_dom7_lit)
 
     # Only add simple tensions for display (don’t change base quality)
     tens = []
@@ -194,17 +286,56 @@ def pretty_from_rn_and_literal(rn_fig: str, literal: str) -> str:
     return base
 
 
+# ---------------- RN analysis ----------------
+
+def rn_figure_for(h, k: m21key.Key) -> str:
+    """
+    roman.romanNumeralFromChord(h, k).figure, memoized on the chord's
+    pitches/root/bass and the key's tonic/mode (repeated chords in a key
+    are the norm, and the RN analysis is the costliest per-chord step).
+    """
+    return _rn_figure(
+        tuple(p.nameWithOctave for p in h.pitches),
+        h.root().nameWithOctave if h.pitches else None,
+        h.bass().nameWithOctave if h.pitches else None,
+        k.tonic.name,
+        k.mode,
+    )
+
+@lru_cache(maxsize=8192)
+def _rn_figure(pitches, root, bass, tonic, mode) -> str:
+    from music21 import chord, roman
+    from music21 import key as m21key
+    ch = chord.Chord(list(pitches))
+    if root is not None:
+        # ChordSymbols carry an explicit root/bass; don't let Chord re-guess them
+        ch.root(root)
+        ch.bass(bass)
+    return roman.romanNumeralFromChord(ch, m21key.Key(tonic, mode)).figure
+
+
 # ---------------- Key helpers ----------------
 
 def parse_key_arg(kstr: str) -> m21key.Key:
-    """Accepts 'C', 'Eb', 'A-', 'F#', 'C minor'. (Note: '-' in input means flat.)"""
+    """
+    Accepts 'C', 'Eb', 'A-', 'F#', 'C minor'. (Note: '-' in input means flat.)
+    """
+    from music21 import key as m21key
+    # Only the string parse is cached: a Key is mutable, so every caller
+    # gets its own
+    tonic, mode = _split_key_arg(kstr)
+    if mode is None:
+        return m21key.Key(tonic)
+    return m21key.Key(tonic, mode=mode)
+
+@lru_cache(maxsize=256)
+def _split_key_arg(kstr: str):
     kstr = kstr.strip().replace("-", "b")
     parts = kstr.split()
     if len(parts) == 1:
-        return m21key.Key(parts[0])
+        return parts[0], None
     elif len(parts) == 2:
-        tonic, mode = parts[0], parts[1].lower()
-        return m21key.Key(tonic, mode=mode)
+        return parts[0], parts[1].lower()
     else:
         raise ValueError(f"Unrecognized key string: {kstr}")
 
@@ -213,29 +344,187 @@ def prefer_written_key(score) -> m21key.Key:
     Prefer an explicit Key (with mode) if present; else fall back to
     KeySignature.asKey(); else analyze('key').
     """
-    # 1) Explicit <key> (music21.key.Key) carries 'mode'
+    from music21 import key as m21key
+    # One walk: stop at the first explicit <key> (music21.key.Key carries
+    # 'mode'), remembering the first KeySignature along the way
+    ksig = None
     try:
-        k_objs = list(score.recurse().getElementsByClass(m21key.Key))
-        if k_objs:
-            return k_objs[0]
+        for el in score.recurse():
+            if isinstance(el, m21key.Key):
+                return el
+            if ksig is None and isinstance(el, m21key.KeySignature):
+                ksig = el
     except Exception:
         pass
 
+    return _resolve_key(score, None, ksig)
+
+def written_key_and_harmonies(score, key_if_empty: bool = True):
+    """
+    (prefer_written_key(score), [ChordSymbols in document order]) from a
+    single recurse() walk instead of one walk per class.
+    With key_if_empty=False a score without ChordSymbols returns (None, [])
+    and skips key resolution (score.analyze("key") can take seconds).
+    """
+    from music21 import harmony
+    from music21 import key as m21key
+    key_el = ksig = None
+    harmonies = []
+    for el in score.recurse():
+        if isinstance(el, harmony.ChordSymbol):
+            harmonies.append(el)
+        elif key_el is None and isinstance(el, m21key.Key):
+            key_el = el
+        elif ksig is None and isinstance(el, m21key.KeySignature):
+            ksig = el
+    if not harmonies and not key_if_empty:
+        return None, harmonies
+    return _resolve_key(score, key_el, ksig), harmonies
+
+def _resolve_key(score, key_el, ksig):
+    # 1) Explicit <key>
+    if key_el is not None:
+        return key_el
+
     # 2) Fall back to first KeySignature
-    try:
-        ksigs = list(score.recurse().getElementsByClass(m21key.KeySignature))
-        if ksigs:
-            try:
-                return ksigs[0].asKey()
-            except Exception:
-                pass
-    except Exception:
-        pass
+    if ksig is not None:
+        try:
+            return ksig.asKey()
+        except Exception:
+            pass
 
     # 3) Last resort
     return score.analyze("key")
 
+def measure_number(el):
+    """el.measureNumber, reading the enclosing Measure directly when it's the activeSite."""
+    site = el.activeSite
+    if site is not None and site.isMeasure:
+        return site.number
+    return el.measureNumber
+
 def pretty_key_name(k: m21key.Key) -> str:
     """Convert E- / E+ naming to Eb / E#, keep 'major'/'minor'."""
-    tonic = k.tonic.name.replace("-", "b").replace("+", "#")
-    return f"{tonic} {k.mode}"
\ No newline at end of file
+    return _pretty_key_name(k.tonic.name, k.mode)
+
+_KEY_ACCIDENTALS = str.maketrans({"-": "b", "+": "#"})
+
+@lru_cache(maxsize=256)
+def _pretty_key_name(tonic_name: str, mode: str) -> str:
+    # Keyed on strings: Key objects hash by identity and are mutable
+    return f"{tonic_name.translate(_KEY_ACCIDENTALS)} {mode}"
+
+
+# ---------------- Fast MusicXML read ----------------
+
+def harmony_skeleton(path: str, key_if_empty: bool = True):
+    """
+    Stand-in for converter.parse when only keys and chord symbols are needed:
+    a Score holding metadata plus one Measure per <measure> with just its
+    Key/KeySignature and ChordSymbol objects at their offsets, so
+    written_key_and_harmonies and measure_number read it like the full score.
+    Elements are built by music21's own MusicXML converters (same figures,
+    pitches and bar numbers); notes, spanners and layout are never made.
+
+    Returns None when converter.parse should be used instead: music21 has an
+    up-to-date pickle of the file (loading it beats the skeleton, and only
+    converter.parse writes one), score-timewise files, multi-staff parts
+    (split into PartStaffs, which reorders the walk), and scores whose key
+    would come from score.analyze("key") (chords, or key_if_empty, with no
+    written key usable as a Key).
+    """
+    import copy
+    import io
+    import xml.etree.ElementTree as ET
+    from music21 import converter, defaults, stream
+    from music21 import key as m21key
+    from music21.common import opFrac
+    from music21.musicxml import xmlToM21
+
+    fp_load, _write, fp_pickle = converter.PickleFilter(path).status()
+    if fp_pickle is not None and fp_load == fp_pickle:
+        return None
+
+    if path.lower().endswith(".mxl"):
+        data = converter.ArchiveManager(path).getData()
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        root = ET.parse(io.StringIO(data)).getroot()
+    else:
+        root = ET.parse(path).getroot()
+    if root.tag != "score-partwise":
+        return None
+    if any(int(st.text or 1) > 1 for st in root.iter("staves")):
+        return None
+
+    importer = xmlToM21.MusicXMLImporter()
+    score = stream.Score()
+    md = importer.xmlMetadata(root)
+    if md is not None:
+        score.coreInsert(0, md)
+
+    keys = []
+    has_harmony = False
+    for mxPart in root.findall("part"):
+        pp = xmlToM21.PartParser(mxPart, parent=importer)
+        part = stream.Part()
+        divisions = defaults.divisionsPerQuarter
+        for i, mxMeasure in enumerate(mxPart.findall("measure")):
+            mp = xmlToM21.MeasureParser(mxMeasure, parent=pp)
+            mp.parseMeasureNumbers()
+            pp.setLastMeasureInfo(mp.stream)
+            # Track the note cursor as MeasureParser does (opFrac at every
+            # step, so offsets and their sort order match converter.parse)
+            pos = 0.0
+            for el in mxMeasure:
+                tag = el.tag
+                if tag == "note":
+                    dur = el.find("duration")
+                    if dur is not None and el.find("chord") is None and el.find("grace") is None:
+                        pos = opFrac(pos + opFrac(float(dur.text) / divisions))
+                elif tag == "backup":
+                    change = float(el.find("duration").text) / divisions
+                    pos = max(opFrac(pos - change), 0.0)
+                elif tag == "forward":
+                    change = opFrac(float(el.find("duration").text) / divisions)
+                    pos = opFrac(pos + change)
+                elif tag == "attributes":
+                    dv = el.find("divisions")
+                    if dv is not None:
+                        divisions = opFrac(float(dv.text))
+                    for mxKey in el.findall("key"):
+                        ks = mp.xmlToKeySignature(mxKey)
+                        keys.append(ks)
+                        mp.stream.coreInsert(pos, ks)
+                elif tag == "harmony":
+                    mp.divisions = divisions
+                    offset = opFrac(pos + mp.xmlToOffset(el))
+                    # Same <harmony> markup → same ChordSymbol: copy a cached one
+                    # (building it realizes the pitches, the costly part)
+                    for mxOffset in el.findall("offset"):
+                        el.remove(mxOffset)
+                    el.tail = None
+                    mp.stream.coreInsert(offset, copy.deepcopy(_chord_symbol_prototype(ET.tostring(el))))
+                    has_harmony = True
+            mp.stream.coreElementsChanged()
+            part.coreInsert(float(i), mp.stream)
+        part.coreElementsChanged()
+        score.coreInsert(0, part)
+    score.coreElementsChanged()
+
+    if has_harmony or key_if_empty:
+        # _resolve_key must not reach analyze(): that needs the notes
+        if not any(isinstance(ks, m21key.Key) for ks in keys):
+            try:
+                if not keys or any(ks.asKey() is None for ks in keys):
+                    return None
+            except Exception:
+                return None
+    return score
+
+@lru_cache(maxsize=1024)
+def _chord_symbol_prototype(mx_harmony: bytes):
+    # Never inserted anywhere: harmony_skeleton only hands out copies
+    import xml.etree.ElementTree as ET
+    from music21.musicxml import xmlToM21
+    return xmlToM21.MeasureParser().xmlToChordSymbol(ET.fromstring(mx_harmony))
@@ -1,11 +1,18 @@
 # scan_rn_patterns.py
-# Strict-by-default scanner with family wildcards; folder support (alphabetical).
+# Strict-by-default scanner with family wildcards; folder support (alphabetical, scanned in parallel).
 
 import argparse
+import csv
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Tuple, Dict
-from music21 import converter, harmony, roman
-from rn_utils import prettify_literal, pretty_from_rn_and_literal, prefer_written_key
+from typing import Any, List, Tuple, Dict
+from rn_utils import (prettify_literal, pretty_from_rn_and_literal, pretty_key_name, measure_number,
+                      rn_figure_for, written_key_and_harmonies, harmony_skeleton)
 
 # --- Pattern token syntax ---
 # Exact (strict match, no wildcard):
@@ -28,37 +35,43 @@ from rn_utils import prettify_literal, pretty_from_rn_and_literal, prefer_writte
 # Wildcards affect only quality (extensions, tensions, alterations),
 # not root or function (I* won’t match ii or V).
 
-_TOKEN_RE = __import__("re").compile(
-    r"""
-    ^                                           # start
-    [b#]?(?:VII|VI|V|IV|III|II|I|vii|vi|v|iv|iii|ii|i)  # degree
-    (?:maj7|-7|7|ø7|o7|6/9|-6|6)?               # optional quality
-    \*?                                         # optional family wildcard
-    $                                           # end
-    """,
-    __import__("re").VERBOSE,
-)
-
-_DEGREE_HEAD = __import__("re").compile(r"^([b#]?)(VII|VI|V|IV|III|II|I|vii|vi|v|iv|iii|ii|i)")
+# Token grammar as static tables: [b#]? DEGREE QUALITY? '*'?
+_DEG_SET = frozenset(["VII", "VI", "V", "IV", "III", "II", "I", "vii", "vi", "v", "iv", "iii", "ii", "i"])
+_QUAL_SET = frozenset(["", "maj7", "-7", "7", "ø7", "o7", "6/9", "-6", "6"])
 
 def _degree_only(tok: str) -> str:
-    m = _DEGREE_HEAD.match(tok or "")
-    return m.group(0) if m else ""
+    tok = tok or ""
+    i = 1 if tok[:1] in ("b", "#") else 0
+    for n in (3, 2, 1):  # longest degree first (VII before VI before V)
+        if tok[i:i + n] in _DEG_SET:
+            return tok[:i + n]
+    return ""
+
+def _is_valid_token(tok: str) -> bool:
+    head = _degree_only(tok)
+    if not head:
+        return False
+    qual = tok[len(head):]
+    if qual.endswith("*"):
+        qual = qual[:-1]
+    return qual in _QUAL_SET
 
 def _suffix_only(tok: str) -> str:
     head = _degree_only(tok)
     return tok[len(head):] if head else tok
 
+# Degrees are ASCII, so case is a range test on the first character
+# (an accidental prefix like 'b' reads as lowercase, as with str.isupper)
 def _is_major_family(tok: str) -> bool:
     deg = _degree_only(tok)
-    if not deg or not deg[0].isupper():
+    if not deg or not ("A" <= deg[0] <= "Z"):
         return False
     suf = _suffix_only(tok).lower()
     return suf in ("", "6", "maj7", "6/9")
 
 def _is_minor_family(tok: str) -> bool:
     deg = _degree_only(tok)
-    if not deg or deg[0].isupper():
+    if not deg or "A" <= deg[0] <= "Z":
         return False
     suf = _suffix_only(tok).lower()
     # include minor–major7 per your request
@@ -66,36 +79,108 @@ def _is_minor_family(tok: str) -> bool:
 
 def _is_dom7_family(tok: str) -> bool:
     deg = _degree_only(tok)
-    if not deg or not deg[0].isupper():
+    if not deg or not ("A" <= deg[0] <= "Z"):
         return False
     suf = _suffix_only(tok).lower()
     # Dominant must contain '7' but not maj/ø/o; alterations/sus are normalized into literal only
     return ("7" in suf) and ("maj" not in suf) and ("ø" not in suf) and ("o" not in suf)
 
+# Family bits, precomputed once per sequence token
+_FAM_MAJOR = 1
+_FAM_MINOR = 2
+_FAM_DOM7  = 4
+
+def _family_bits(tok: str) -> int:
+    bits = 0
+    if _is_major_family(tok):
+        bits |= _FAM_MAJOR
+    if _is_minor_family(tok):
+        bits |= _FAM_MINOR
+    if _is_dom7_family(tok):
+        bits |= _FAM_DOM7
+    return bits
+
+# Tokens and degrees are interned to small ints so the matcher compares
+# machine words, not strings. IDs are per process; they never leave it.
+TOK_INTERN: Dict[str, int] = {}
+
+def intern_tok(s: str) -> int:
+    i = TOK_INTERN.get(s)
+    if i is None:
+        i = TOK_INTERN[s] = len(TOK_INTERN)
+    return i
+
+# A degree key packs (degree_id, family_bits) into one int: id << 3 | bits
+_FAM_SHIFT = 3
+_FAM_ALL = (1 << _FAM_SHIFT) - 1
+
+def _degree_key(tok: str) -> int:
+    return (intern_tok(_degree_only(tok)) << _FAM_SHIFT) | _family_bits(tok)
+
+# (bar, token, literal, token_id, degree_key)
+SeqItem = Tuple[int, str, str, int, int]
+
+def _seq_item(bar: int, tok: str, lit: str) -> SeqItem:
+    return (bar, tok, lit, intern_tok(tok), _degree_key(tok))
+
+def _compile_pattern_token(ptok: str) -> Tuple[bool, int, int]:
+    """
+    (is_wildcard, want, mask) for one pattern token. An exact token matches
+    when token_id == want; a wildcard when degree_key & mask == want, i.e.
+    same degree id and the wanted family bit set.
+    """
+    if not ptok.endswith("*"):
+        return (False, intern_tok(ptok), 0)
+    base = ptok[:-1]
+    # Family selection by case / desired suffix
+    if base and "A" <= base[0] <= "Z":
+        # uppercase: major family unless specifically '7*' -> dominant family
+        bit = _FAM_DOM7 if _suffix_only(base).lower() == "7" else _FAM_MAJOR
+    else:
+        # lowercase: minor family (includes minor–maj7)
+        bit = _FAM_MINOR
+    return (True, (intern_tok(_degree_only(base)) << _FAM_SHIFT) | bit, ~_FAM_ALL | bit)
+
+@dataclass
+class CompiledPattern:
+    """A pattern as matcher rows (is_wildcard, want, mask), one per token."""
+    n: int
+    rows: List[Tuple[bool, int, int]]
+    spec: Any = None  # rows as an intc array for the numba kernel, made on first use
+
+@lru_cache(maxsize=None)
+def compile_pattern(pat_tokens: Tuple[str, ...]) -> CompiledPattern:
+    """
+    Compile once per process and reuse across files. Cached rather than
+    built in main because token ids are only meaningful in the process
+    that interned them.
+    """
+    return CompiledPattern(len(pat_tokens), [_compile_pattern_token(t) for t in pat_tokens])
+
 def parse_pattern(pat: str) -> List[str]:
     toks = pat.strip().split()
     for t in toks:
-        if not _TOKEN_RE.match(t):
+        if not _is_valid_token(t):
             raise SystemExit(f"Pattern error: Bad token syntax: '{t}'")
     return toks
 
-def extract_rn_sequence(xml_path: str) -> List[Tuple[int, str, str]]:
+def extract_rn_sequence(harmonies, k) -> List[SeqItem]:
     """
-    Return a sequence of (barNumber, rnToken, literal) for a single file.
-    rnToken is produced by rn_utils.pretty_from_rn_and_literal to keep tokens canonical.
+    Return a sequence of (barNumber, rnToken, literal, tokenId, degreeKey)
+    for a score's ChordSymbols analyzed in key `k` (both as returned by
+    rn_utils.written_key_and_harmonies). rnToken is produced by
+    rn_utils.pretty_from_rn_and_literal to keep tokens canonical; the last
+    two are the interned ints the matcher compares.
     """
-    s = converter.parse(xml_path)
-    k = prefer_written_key(s)
     out: List[Tuple[int, str, str]] = []
-    for h in s.recurse().getElementsByClass(harmony.ChordSymbol):
+    for h in harmonies:
         try:
-            mnum = h.measureNumber
+            mnum = measure_number(h)
         except Exception:
             mnum = None
         lit = prettify_literal(h.figure or "")
         try:
-            rn = roman.romanNumeralFromChord(h, k)
-            tok = pretty_from_rn_and_literal(rn.figure, lit)
+            tok = pretty_from_rn_and_literal(rn_figure_for(h, k), lit, already_pretty=True)
         except Exception:
             tok = ""
         if tok:
@@ -104,46 +189,119 @@ def extract_rn_sequence(xml_path: str) -> List[Tuple[int, str, str]]:
             out.append((mnum or 0, "", lit))
     # stable, in-bar order is already given by recursion; ensure numeric bar order just in case
     out.sort(key=lambda x: (x[0]))
+    return [_seq_item(*x) for x in out]
+
+# Below this many chords the plain loop beats NumPy's per-call overhead
+_NP_MIN_SEQ = 256
+# ...and the compiled kernel's, when numba is installed
+_JIT_MIN_SEQ = 64
+
+def _scan_windows(ids, keys, spec, out) -> int:
+    """
+    Window scan over int arrays, written for numba: spec rows are
+    (is_wildcard, want, mask) as from _compile_pattern_token; match starts
+    are stored into `out` and their count returned.
+    """
+    n = spec.shape[0]
+    count = 0
+    for i in range(ids.shape[0] - n + 1):
+        for j in range(n):
+            if spec[j, 0]:
+                if keys[i + j] & spec[j, 2] != spec[j, 1]:
+                    break
+            elif ids[i + j] != spec[j, 1]:
+                break
+        else:
+            out[count] = i
+            count += 1
+    return count
+
+@lru_cache(maxsize=1)
+def _jit_kernel():
+    """
+    _scan_windows compiled by numba, or None when numba isn't installed (it
+    is optional). The first call compiles through LLVM; cache=True keeps the
+    machine code on disk so later runs and worker processes just load it.
+    """
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    return njit(cache=True)(_scan_windows)
+
+def _match_starts_np(seq_ids: array, deg_keys: array, compiled) -> List[int]:
+    """
+    Vectorized window test for long sequences: column j of the
+    (S-n+1, n) sliding window is compared against pattern token j in one
+    NumPy pass and the columns are AND-reduced. numpy ships with music21.
+    """
+    import numpy as np  # deferred with music21; only long sequences need it
+    ids = np.frombuffer(seq_ids, dtype=np.intc)
+    keys = np.frombuffer(deg_keys, dtype=np.intc)
+    width = len(ids) - len(compiled) + 1
+    ok = np.ones(width, dtype=bool)
+    for j, (is_wild, want, mask) in enumerate(compiled):
+        if is_wild:
+            ok &= (keys[j : j + width] & mask) == want
+        else:
+            ok &= ids[j : j + width] == want
+    return np.flatnonzero(ok).tolist()
+
+def _match_starts(seq_ids: array, deg_keys: array, compiled) -> List[int]:
+    n = len(compiled)
+    # Only positions whose token can start the pattern are tried. One int
+    # pass finds them: a by-token/by-degree index would be rebuilt per call
+    # and read once, so it costs the same pass plus the dict work
+    is_wild0, want0, mask0 = compiled[0]
+    if is_wild0:
+        starts = [i for i, dk in enumerate(deg_keys) if dk & mask0 == want0]
+    else:
+        starts = [i for i, tid in enumerate(seq_ids) if tid == want0]
+
+    out: List[int] = []
+    last = len(seq_ids) - n
+    for i in starts:
+        if i > last:
+            break
+        for j in range(1, n):
+            is_wild, want, mask = compiled[j]
+            if is_wild:
+                if deg_keys[i + j] & mask != want:
+                    break
+            elif seq_ids[i + j] != want:
+                break
+        else:
+            out.append(i)
     return out
 
-def find_pattern_matches(seq: List[Tuple[int, str, str]], pat_tokens: List[str]) -> List[Dict]:
+def find_pattern_matches(seq: List[SeqItem], pattern: CompiledPattern) -> List[Dict]:
     hits: List[Dict] = []
-    n = len(pat_tokens)
-    if n == 0:
+    n = pattern.n
+    if n == 0 or n > len(seq):
         return hits
-    # sliding window
-    for i in range(0, len(seq) - n + 1):
-        window = seq[i : i + n]  # [(bar, tok, lit), ...]
-        match = True
-        for ptok, (_, stok, _slit) in zip(pat_tokens, window):
-            if ptok.endswith("*"):
-                base = ptok[:-1]
-                if _degree_only(base) != _degree_only(stok):
-                    match = False
-                    break
-                # Family selection by case / desired suffix
-                suf = _suffix_only(base).lower()
-                if base and base[0].isupper():
-                    # uppercase: major family unless specifically '7*' -> dominant family
-                    if suf == "7":
-                        if not _is_dom7_family(stok):
-                            match = False; break
-                    else:
-                        if not _is_major_family(stok):
-                            match = False; break
-                else:
-                    # lowercase: minor family (includes minor–maj7)
-                    if not _is_minor_family(stok):
-                        match = False; break
-            else:
-                if stok != ptok:
-                    match = False
-                    break
-        if match:
-            bar0 = window[0][0]
-            lits = [l for (_b, _t, l) in window]
-            toks = [t for (_b, t, _l) in window]
-            hits.append({"bar": bar0, "tokens": toks, "literals": lits})
+    # The window test is only int equality (exact tokens) or a masked int
+    # equality (wildcards); see compile_pattern
+    compiled = pattern.rows
+    seq_ids = array("i", [it[3] for it in seq])
+    deg_keys = array("i", [it[4] for it in seq])
+
+    kernel = _jit_kernel() if len(seq) >= _JIT_MIN_SEQ else None
+    if kernel is not None:
+        import numpy as np
+        if pattern.spec is None:
+            pattern.spec = np.array(compiled, dtype=np.intc)
+        out = np.empty(len(seq), dtype=np.intp)
+        count = kernel(np.frombuffer(seq_ids, dtype=np.intc), np.frombuffer(deg_keys, dtype=np.intc),
+                       pattern.spec, out)
+        starts = out[:count].tolist()
+    elif len(seq) >= _NP_MIN_SEQ:
+        starts = _match_starts_np(seq_ids, deg_keys, compiled)
+    else:
+        starts = _match_starts(seq_ids, deg_keys, compiled)
+    for i in starts:
+        window = seq[i : i + n]
+        hits.append({"bar": window[0][0], "tokens": [w[1] for w in window],
+                     "literals": [w[2] for w in window]})
     return hits
 
 def iter_musicxml_paths(base: Path):
@@ -151,10 +309,73 @@ def iter_musicxml_paths(base: Path):
         if base.suffix.lower() in (".musicxml", ".xml", ".mxl"):
             return [base]
         return []
+    # One scandir pass over the tree, classifying by suffix as we go
     files = []
-    for ext in ("*.musicxml", "*.xml", "*.mxl"):
-        files.extend(base.rglob(ext))
-    return sorted([p for p in files if p.is_file()], key=lambda p: p.name.lower())
+    stack = [str(base)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    stack.append(e.path)
+                elif e.is_file() and e.name.lower().endswith((".musicxml", ".xml", ".mxl")):
+                    files.append(Path(e.path))
+    return sorted(files, key=lambda p: p.name.lower())
+
+# Rows are formatted in the workers; quoting follows csv.writer's default
+# (excel dialect, QUOTE_MINIMAL) so the file is identical either way
+_CSV_SPECIAL = (",", '"', "\r", "\n")
+
+def _q(v: str) -> str:
+    if any(c in v for c in _CSV_SPECIAL):
+        return '"' + v.replace('"', '""') + '"'
+    return v
+
+def _csv_line(fields: List[str]) -> str:
+    return ",".join([_q(f) for f in fields]) + "\r\n"
+
+def _scan_one_file(job) -> Tuple[List[str], List[str]]:
+    """
+    Parse and scan one file in a worker process.
+    Returns the console lines and the CSV rows (already formatted) for that file, in order.
+    """
+    from music21 import converter  # deferred: music21 start-up is slow
+    path_str, patlist, verbose, show_literals = job
+    xmlp = Path(path_str)
+    lines: List[str] = []
+    rows: List[str] = []
+    try:
+        # Only keys and chord symbols are scanned: skip the full score build when we can
+        try:
+            s = harmony_skeleton(path_str, key_if_empty=False)
+        except Exception:
+            s = None  # the full importer parses it, or reports the error
+        if s is None:
+            s = converter.parse(path_str)
+        # no chords means no hits: don't pay for key analysis
+        k, harmonies = written_key_and_harmonies(s, key_if_empty=False)
+        # best-effort title
+        title = (s.metadata.title if s.metadata and s.metadata.title else xmlp.stem)
+        seq = extract_rn_sequence(harmonies, k)
+        key_str = pretty_key_name(k) if k is not None else ""  # same for every CSV row of this file
+    except Exception as e:
+        lines.append(f"× {xmlp.stem}: ERROR ({e})")
+        return lines, rows
+
+    for pat_str, toks in patlist:
+        hits = find_pattern_matches(seq, compile_pattern(toks))
+        if verbose:
+            lines.append(f"✓ {xmlp.stem} [{pat_str}]: {len(hits)} hit(s)")
+            for h in hits:
+                line = f"  → bar {h['bar']}: " + " ".join(h["tokens"])
+                if show_literals:
+                    line += "  |  " + " | ".join(h["literals"])
+                lines.append(line)
+        for h in hits:
+            row = [title, path_str, key_str, str(h["bar"]), pat_str, " ".join(h["tokens"])]
+            if show_literals:
+                row.append(" | ".join(h["literals"]))
+            rows.append(_csv_line(row))
+    return lines, rows
 
 def main():
     ap = argparse.ArgumentParser()
@@ -176,48 +397,25 @@ def main():
     patlist = []
     for p in args.patterns:
         toks = parse_pattern(p)
-        patlist.append((p, toks))
-
-    import csv, sys as _sys
-    writer = None
-    if args.csv_out:
-        fout = open(args.csv_out, "w", newline="")
-        writer = csv.writer(fout)
-        header = ["Title", "Path", "Key", "Bar", "Pattern", "Tokens"]
-        if args.show_literals:
-            header.append("Literals")
-        writer.writerow(header)
-
-    for xmlp in paths:
-        try:
-            s = converter.parse(str(xmlp))
-            k = prefer_written_key(s)
-            # best-effort title
-            title = (s.metadata.title if s.metadata and s.metadata.title else xmlp.stem)
-            seq = extract_rn_sequence(str(xmlp))
-        except Exception as e:
-            print(f"× {xmlp.stem}: ERROR ({e})")
-            continue
-
-        for pat_str, toks in patlist:
-            hits = find_pattern_matches(seq, toks)
-            if args.verbose:
-                print(f"✓ {xmlp.stem} [{pat_str}]: {len(hits)} hit(s)")
-                for h in hits:
-                    line = f"  → bar {h['bar']}: " + " ".join(h["tokens"])
-                    if args.show_literals:
-                        line += "  |  " + " | ".join(h["literals"])
-                    print(line)
-            if writer and hits:
-                for h in hits:
-                    row = [title, str(xmlp), f"{k.tonic.name.replace('-', 'b').replace('+', '#')} {k.mode}",
-                           h["bar"], pat_str, " ".join(h["tokens"])]
-                    if args.show_literals:
-                        row.append(" | ".join(h["literals"]))
-                    writer.writerow(row)
-
-    if writer:
-        fout.close()
+        patlist.append((p, tuple(toks)))
+
+    # Files are independent: scan them across cores, report in path order
+    jobs = [(str(xmlp), patlist, args.verbose, args.show_literals) for xmlp in paths]
+    with ExitStack() as stack:
+        fout = None
+        if args.csv_out:
+            fout = stack.enter_context(open(args.csv_out, "w", newline="", buffering=1 << 20, encoding="utf-8"))
+            header = ["Title", "Path", "Key", "Bar", "Pattern", "Tokens"]
+            if args.show_literals:
+                header.append("Literals")
+            csv.writer(fout).writerow(header)
+
+        ex = stack.enter_context(ProcessPoolExecutor(max_workers=os.cpu_count()))
+        for lines, rows in ex.map(_scan_one_file, jobs):
+            for line in lines:
+                print(line)
+            if fout is not None:
+                fout.write("".join(rows))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file